@@ -1,5 +1,3 @@
-from itertools import product
-
 # ----------------------------------
 # Majority gate
 # ----------------------------------
@@ -8,8 +6,9 @@ def M(a, b, c):
 
 # ----------------------------------
 # MG-EC Macro for 4 inputs using only majority logic
+# `one` is the all-ones word: 1 for a single row, LANE_MASK for packed rows.
 # ----------------------------------
-def mg_ec(a, b, c, d):
+def mg_ec(a, b, c, d, one=1):
     # Sum bit (XOR of all inputs)
     S = a ^ b ^ c ^ d
 
@@ -21,25 +20,105 @@ def mg_ec(a, b, c, d):
     # T = M( M(a, b, c), M(a, b, d), M(a, c, d) ) | M(b, c, d)
     # K = T &  ~C
     X = M(a, b, c)
-    Y = M(a, d, M(b,c,1))  # uses OR
-    T = M(X,Y,1)
+    Y = M(a, d, M(b,c,one))  # uses OR
+    T = M(X,Y,one)
     K = M(T, 0, (~C))
     return S, K, C
 
+# ----------------------------------
+# Specialized kernel: trace mg_ec once on symbolic inputs, folding the
+# constant majority taps (M(x,y,0) = x&y, M(x,y,1) = x|y), and compile the
+# result into one straight-line function with no M() calls.
+# ----------------------------------
+LANE_MASK = 0xffff  # all-ones word for the 16 packed truth-table rows
+
+class _Sym:
+    def __init__(self, name, lines, is_one=False):
+        self.name, self.lines, self.is_one = name, lines, is_one
+
+    @staticmethod
+    def _const(other):
+        # Plain operands are constant taps: only 0 and the all-ones lane mask fold
+        if isinstance(other, int) and other in (0, LANE_MASK):
+            return other
+        raise TypeError(f"_Sym operand must be a _Sym, 0 or LANE_MASK, not {other!r}")
+
+    def _emit(self, op, other):
+        tmp = f"t{len(self.lines)}"
+        self.lines.append(f"    {tmp} = {self.name} {op} {other.name}")
+        return _Sym(tmp, self.lines)
+
+    def __and__(self, other):
+        if not isinstance(other, _Sym):
+            return 0 if self._const(other) == 0 else self
+        if other.is_one:
+            return self
+        if self.is_one:
+            return other
+        return self._emit("&", other)
+
+    def __or__(self, other):
+        if not isinstance(other, _Sym):
+            return self if self._const(other) == 0 else other
+        if self.is_one or other.is_one:
+            return self if self.is_one else other
+        return self._emit("|", other)
+
+    def __xor__(self, other):
+        if not isinstance(other, _Sym):
+            return self if self._const(other) == 0 else ~self
+        return self._emit("^", other)
+
+    def __invert__(self):
+        tmp = f"t{len(self.lines)}"
+        self.lines.append(f"    {tmp} = ~{self.name}")
+        return _Sym(tmp, self.lines)
+
+    __rand__, __ror__, __rxor__ = __and__, __or__, __xor__
+
+
+def _specialize_mg_ec():
+    lines = []
+    a, b, c, d = (_Sym(n, lines) for n in "abcd")
+    S, K, C = mg_ec(a, b, c, d, one=_Sym("one", lines, is_one=True))
+    src = "def mg_ec_flat(a, b, c, d, one):\n" + "\n".join(lines) + f"\n    return {S.name}, {K.name}, {C.name}\n"
+    namespace = {}
+    exec(compile(src, "<mg_ec_flat>", "exec"), namespace)
+    return namespace["mg_ec_flat"]
+
+
+mg_ec_flat = _specialize_mg_ec()
+
 # ----------------------------------
 # Truth Table & Verification
+# All 16 rows are evaluated in one call: bit i of each word is row i
+# (row i = binary abcd, a is the MSB, same order as product([0,1], repeat=4)).
 # ----------------------------------
-print("a b c d | C  K  S | Check")
-print("-" * 32)
+A, B, C_, D = 0xff00, 0xf0f0, 0xcccc, 0xaaaa
+
+S, K, C = mg_ec_flat(A, B, C_, D, LANE_MASK)
+
+# Reference a+b+c+d per lane from two half adders and a final FA (plain
+# XOR/AND, independent of the majority construction); a row is OK when
+# C K S equals it bit for bit, so the whole check is a few word ops.
+hs1, hc1 = A ^ B, A & B
+hs2, hc2 = C_ ^ D, C_ & D
+ref0, c0 = hs1 ^ hs2, hs1 & hs2
+ref1 = hc1 ^ hc2 ^ c0
+ref2 = (hc1 & hc2) | (hc1 & c0) | (hc2 & c0)
+OK = ~((S ^ ref0) | (K ^ ref1) | (C ^ ref2)) & LANE_MASK
+
+out = ["a b c d | C  K  S | Check", "-" * 32]
 bad_rows = []
 
-for a, b, c, d in product([0, 1], repeat=4):
-    S, K, C = mg_ec(a, b, c, d)
-    total = a + b + c + d
-    check_ok = (S + 2*K + 4*C) == total
-    print(f"{a} {b} {c} {d} | {C}  {K}  {S} | {'OK' if check_ok else 'BAD'}")
+for i in range(16):
+    a, b, c, d = (A >> i) & 1, (B >> i) & 1, (C_ >> i) & 1, (D >> i) & 1
+    s, k, cc = (S >> i) & 1, (K >> i) & 1, (C >> i) & 1
+    check_ok = (OK >> i) & 1
+    out.append(f"{a} {b} {c} {d} | {cc}  {k}  {s} | {'OK' if check_ok else 'BAD'}")
     if not check_ok:
-        bad_rows.append(((a, b, c, d), (C, K, S), total))
+        bad_rows.append(((a, b, c, d), (cc, k, s), a + b + c + d))
+print("\n".join(out))
 
 print("\nVerification:", "ALL OK" if not bad_rows else f"{len(bad_rows)} BAD ROWS")
 if bad_rows:
@@ -1,40 +1,43 @@
-from collections import defaultdict
-
 def analyze_csa(n):
-    # Initial: all ones in column 0
-    columns = defaultdict(int)
+    # Initial: all ones in column 0. Columns are dense 0..hi, and a bit in
+    # column i means the value is >= 2^i, so n.bit_length()+2 slots suffice.
+    columns = [0] * (n.bit_length() + 2)
     columns[0] = n  # All n inputs in col 0
+    hi = 0  # highest column in use
     fa_count = 0
     levels = 0
 
     print(f"Starting CSA reduction for n={n}")
-    print(f"Initial columns: {dict(columns)}")
+    print(f"Initial columns: { {i: columns[i] for i in range(hi + 1)} }")
 
     # Perform reduction
     while True:
         changed = False
-        new_columns = columns.copy()
-        for i in sorted(columns.keys()):
-            while new_columns[i] >= 3:
-                # Apply one full adder (3:2)
-                new_columns[i] -= 3
-                new_columns[i] += 1  # sum bit
-                new_columns[i+1] += 1  # carry bit
-                fa_count += 1
+        # Columns created during this level are handled in the next one
+        for i in range(hi + 1):
+            c = columns[i]
+            if c >= 3:
+                # Each full adder (3:2) nets -2 here and +1 carry into i+1;
+                # apply them until at most 2 bits remain: t = (c-1)//2 FAs
+                t = (c - 1) // 2
+                columns[i] = c - 2 * t
+                columns[i+1] += t
+                fa_count += t
                 changed = True
-        columns = new_columns
+        if columns[hi + 1]:
+            hi += 1
         if changed:
             levels += 1
         else:
             break
 
     # Now columns have at most 2 tokens each
-    row_a = sum(1 for v in columns.values() if v >= 1)
-    row_b = sum(1 for v in columns.values() if v >= 2)
-    max_col = max(columns.keys())
+    row_a = sum(1 for v in columns if v >= 1)
+    row_b = sum(1 for v in columns if v >= 2)
+    max_col = hi
 
     print("\nFinal state after CSA:")
-    print(f"Columns: {dict(columns)}")
+    print(f"Columns: { {i: columns[i] for i in range(hi + 1)} }")
     print(f"Levels of FA used: {levels}")
     print(f"Total FAs: {fa_count}")
     print(f"Row A bits: {row_a}, Row B bits: {row_b}")
@@ -1,50 +1,55 @@
 # Running the corrected simulation: use K = 2^w - th and check carry-out (Cin=0).
 import math
-from itertools import product
+from concurrent.futures import ProcessPoolExecutor
 
-def add_with_cout(a, b, bits):
-    # """Binary addition of a and b with fixed 'bits' width; return carry-out."""
-    carry = 0
-    for i in range(bits):
-        abit = (a >> i) & 1
-        bbit = (b >> i) & 1
-        total = abit + bbit + carry
-        carry = 1 if total >= 2 else 0
-    return carry
+def test_K_one(n):
+    # Top-level (picklable) so test_K_corrected can hand each n to a worker process
+    th = (n + 1) // 2  # ceil(n/2)
+    hw_bits = n.bit_length()  # bits to represent HW (0..n)
+    w = hw_bits
+    K = (1 << w) - th  # correct bias for w-bit adder
+    Cin = 0
 
-def test_K_corrected(ns):
-    results = []
-    for n in ns:
-        th = math.ceil(n / 2)
-        hw_bits = math.ceil(math.log2(n + 1))  # bits to represent HW (0..n)
-        w = hw_bits
-        K = (1 << w) - th  # correct bias for w-bit adder
-        Cin = 0
-        
-        mismatches = []
-        for bits in product([0,1], repeat=n):
-            HW = sum(bits)
-            majority_truth = 1 if HW >= th else 0
-            cout = add_with_cout(HW, K + Cin, w)
-            if cout != majority_truth:
-                mismatches.append((bits, HW, th, w, K, cout, majority_truth))
-        
-        results.append((n, th, w, K, len(mismatches), mismatches[:8]))  # store first few mismatches if any
-    return results
+    # cout and the majority depend only on HW, so test each weight once
+    # and count its C(n, HW) inputs instead of sweeping all 2^n
+    bad = {}
+    for HW in range(n + 1):
+        majority_truth = 1 if HW >= th else 0
+        # HW and K+Cin both fit in w bits, so bit w of the sum is the carry-out
+        cout = ((HW + K + Cin) >> w) & 1
+        if cout != majority_truth:
+            bad[HW] = (cout, majority_truth)
+    mismatch_count = sum(math.comb(n, HW) for HW in bad)
 
-ns = [3,5,7,11]
-res = test_K_corrected(ns)
+    # Enumerate concrete inputs only for the reported samples (MSB first, as product() gave)
+    samples = []
+    x = 0
+    while bad and len(samples) < 8 and x < (1 << n):
+        HW = x.bit_count()
+        if HW in bad:
+            cout, maj = bad[HW]
+            samples.append((tuple((x >> (n - 1 - i)) & 1 for i in range(n)), HW, th, w, K, cout, maj))
+        x += 1
+    return (n, th, w, K, mismatch_count, samples)  # store first few mismatches if any
 
-for r in res:
-    n, th, w, K, mism_count, sample = r
-    if mism_count == 0:
-        print(f"n={n}: All combinations matched ✅ (th={th}, w={w}, K={K})")
-    else:
-        print(f"n={n}: {mism_count} mismatches ❌ (th={th}, w={w}, K={K})")
-        for entry in sample:
-            bits, HW, th, w, K, cout, maj = entry
-            print(f"  Sample mismatch: Input={bits}, HW={HW}, th={th}, w={w}, K={K}, cout={cout}, correct={maj}")
+def test_K_corrected(ns, workers=1):
+    # Each n is independent; workers > 1 fans them out over processes. The
+    # per-n check is only O(n), so the default stays serial and skips pool startup.
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(test_K_one, ns))
+    return [test_K_one(n) for n in ns]
 
-# Return the result object for inspection if needed
-res
+if __name__ == "__main__":
+    ns = [3,5,7,11]
+    res = test_K_corrected(ns)
 
+    for r in res:
+        n, th, w, K, mism_count, sample = r
+        if mism_count == 0:
+            print(f"n={n}: All combinations matched ✅ (th={th}, w={w}, K={K})")
+        else:
+            print(f"n={n}: {mism_count} mismatches ❌ (th={th}, w={w}, K={K})")
+            for entry in sample:
+                bits, HW, th, w, K, cout, maj = entry
+                print(f"  Sample mismatch: Input={bits}, HW={HW}, th={th}, w={w}, K={K}, cout={cout}, correct={maj}")
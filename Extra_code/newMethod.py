@@ -1,78 +1,57 @@
-from itertools import product
-from collections import defaultdict
-import math
+from itertools import islice
 
 def majority_n_folded_bias(m, verbose=False, print_all=False):
     # Parameters for m=7
     # m = 1  # Number of bits
     th = (m + 1) // 2  # ceil(m/2) for majority; for m=7, th=4
-    # Choose minimal w so that 2^w > th - 1
-    # A sufficient and common choice: w = ceil(log2(th)) but we avoid math import
-    w = int(math.ceil(math.log2(th)))
-    while (1 << w) <= (th - 1):
-        w += 1
+    # Choose minimal w so that 2^w > th - 1, i.e. w = ceil(log2(th))
+    w = (th - 1).bit_length()
     # Bias constant
     K = (1 << w) - th  # K = 2^w - th
-    # Prepare K's bit list (LSB first)
-    K_bits = [(K >> j) & 1 for j in range(w)]  # Only 0..w-1 used
+    # Columns are bounded: HW + K < 2^(w+1), so this many never overflows
+    NCOLS = w + m.bit_length() + 2
+    # K is constant, so its column contribution (K's bits, LSB first; only 0..w-1
+    # can be set) is built once; inputs only add HW at column 0
+    base_cols = [(K >> j) & 1 for j in range(NCOLS)]
 
     if verbose:
-        print(f"m={m}, th={th}, w={w}, 2^w={1<<w}, K={K} (bits LSB->MSB: {K_bits})")
+        print(f"m={m}, th={th}, w={w}, 2^w={1<<w}, K={K} (bits LSB->MSB: {base_cols[:w]})")
 
     def reduce_columns_to_two_rows(col_counts):
         """
-        Given a dict column_index -> integer count of single-bit '1's in that column,
+        Given a list column_index -> integer count of single-bit '1's in that column,
         reduce using exact 3:2 compressors (full adders) until at most 2 bits remain per column.
         This models a CSA tree in terms of counts only (no approximations).
+        Each pass is one Wallace level: every column compresses its triples from the
+        pre-pass counts, so carries land in the next level instead of rippling.
         Returns two binary rows (as integers) encoding the same value.
         """
-        # We’ll iteratively apply "carry the third bit up" until each column count <= 2
-        cols = dict(col_counts)  # copy
-        while True:
-            changed = False
-            # Work on a bounded range of columns
-            keys = list(cols.keys())
-            if not keys:
-                break
-            for i in range(min(keys), max(keys)+1):
-                c = cols.get(i, 0)
-                if c >= 3:
-                    # Every triple in column i becomes 1 bit in i and 1 bit in i+1:
-                    triple = c // 3
-                    rem = c % 3
-                    cols[i] = rem + triple  # rem + the 'sum' bits from triples
-                    cols[i+1] = cols.get(i+1, 0) + triple  # carry bits into higher column
-                    changed = True
-            if not changed:
-                break
-
-            # After one sweep, there still might be columns with >2 due to carries; continue loops.
+        cols = list(col_counts)  # copy
+        while max(cols) >= 3:
+            # Every triple in column i becomes 1 bit in i and 1 bit in i+1
+            triples = [c // 3 for c in cols]
+            carries_in = [0] + triples[:-1]
+            cols = [c % 3 + t + cin for c, t, cin in zip(cols, triples, carries_in)]
 
         # Now each column has 0,1, or 2 bits left. Create two rows by assigning bits.
         rowA = 0
         rowB = 0
-        for i, c in cols.items():
+        for i, c in enumerate(cols):
             if c >= 1:
                 rowA |= (1 << i)
             if c >= 2:
                 rowB |= (1 << i)
         return rowA, rowB
 
-    def simulate_once(x_bits, verbose_local=False):
-        # x_bits: tuple/list of m bits (each 0/1)
-        HW = sum(x_bits)
+    def simulate_hw(HW, verbose_local=False):
+        # Everything below depends on the input only through its Hamming weight
 
-        # Build initial column counts: all input ones in column 0
-        col_counts = defaultdict(int)
-        col_counts[0] = HW
-
-        # Inject K bits into their columns
-        for j, kb in enumerate(K_bits):
-            if kb == 1:
-                col_counts[j] += 1
+        # Initial column counts: K bits in their columns, all input ones in column 0
+        col_counts = base_cols.copy()
+        col_counts[0] += HW
 
         if verbose_local:
-            print(f"Input {''.join(map(str, x_bits))} HW={HW}, initial columns:", dict(col_counts))
+            print(f"HW={HW}, initial columns:", col_counts)
 
         # Reduce to two rows via CSA-style counting
         rowA, rowB = reduce_columns_to_two_rows(col_counts)
@@ -91,46 +70,102 @@ def majority_n_folded_bias(m, verbose=False, print_all=False):
             print(f"rowA bin: {rowA:0{w+2}b}  rowB bin: {rowB:0{w+2}b}")
             print(f"value={value} (bin {value:0{w+2}b}), carry_into_2^w={carry_into_2w}, truth={majority_truth}")
 
+        return rowA, rowB, value, carry_into_2w, majority_truth
+
+    # One CSA evaluation per distinct weight (m+1) instead of per input (2^m),
+    # kept as parallel columns indexed by HW rather than one dict per row
+    rowA_by_hw, rowB_by_hw, value_by_hw, carry_by_hw, truth_by_hw = (
+        list(col) for col in zip(*(simulate_hw(h) for h in range(m + 1))))
+
+    def simulate_once(x):
+        # x: input assignment packed as an m-bit integer (MSB = first input).
+        # Row dicts are only assembled here, for printing.
+        h = x.bit_count()
         return {
-            "inputs": ''.join(map(str, x_bits)),
-            "HW": HW,
-            "rowA": rowA,
-            "rowB": rowB,
-            "value": value,
-            "carry_pred": carry_into_2w,
-            "truth": majority_truth,
-            "match": (carry_into_2w == majority_truth),
+            "inputs": format(x, f"0{m}b"),
+            "HW": h,
+            "rowA": rowA_by_hw[h],
+            "rowB": rowB_by_hw[h],
+            "value": value_by_hw[h],
+            "carry_pred": carry_by_hw[h],
+            "truth": truth_by_hw[h],
+            "match": (carry_by_hw[h] == truth_by_hw[h]),
         }
 
-    # Iterate all inputs and test
-    rows = [simulate_once(bits) for bits in product([0,1], repeat=m)]
-
-    mismatches = [r for r in rows if not r["match"]]
+    # Iterate all inputs and test, bit-sliced: every word below is a Python int
+    # with one bit per input assignment (bit x <-> input x), so each gate
+    # evaluates all 2^m inputs at once.
+    xs = range(1 << m)
+    FULL = (1 << (1 << m)) - 1
+
+    def lane_word(i):
+        # Lanes whose input x has bit i set: runs of 2^i zeros then 2^i ones
+        word = ((1 << (1 << i)) - 1) << (1 << i)
+        period = 2 << i
+        while period < (1 << m):
+            word |= word << period
+            period <<= 1
+        return word
+
+    inputs = [lane_word(i) for i in range(m)]
+
+    # Hardware recurrence: the same Wallace-level CSA as reduce_columns_to_two_rows,
+    # on real FA gates, followed by the rowA + rowB add that yields the carry into 2^w
+    cols = [[] for _ in range(NCOLS)]
+    cols[0].extend(inputs)
+    for j in range(w):
+        if (K >> j) & 1:
+            cols[j].append(FULL)
+    while max(len(col) for col in cols) >= 3:
+        nxt = [[] for _ in range(NCOLS)]
+        for j, col in enumerate(cols):
+            used = len(col) - len(col) % 3
+            for i in range(0, used, 3):
+                a, b, c = col[i:i+3]
+                nxt[j].append(a ^ b ^ c)
+                nxt[j+1].append((a & b) | (a & c) | (b & c))
+            nxt[j].extend(col[used:])
+        cols = nxt
+
+    carry_pred = 0
+    carry = 0
+    for j, col in enumerate(cols):
+        a, b = (col + [0, 0])[:2]
+        s_j = a ^ b ^ carry
+        carry = (a & b) | (a & carry) | (b & carry)
+        if j >= w:
+            carry_pred |= s_j
+    carry_pred |= carry
+
+    # Reference: exact[h] has bit x set iff HW(x) == h
+    exact = [FULL] + [0] * m
+    for word in inputs:
+        for h in range(m, 0, -1):
+            exact[h] = (exact[h] & ~word) | (exact[h-1] & word)
+        exact[0] &= ~word
+    truth = 0
+    for h in range(th, m + 1):
+        truth |= exact[h]
+
+    mismatch_word = carry_pred ^ truth
     print(f"Total combos: {2**m}")
-    print(f"Mismatches: {len(mismatches)}")
-    if mismatches:
+    print(f"Mismatches: {mismatch_word.bit_count()}")
+    if mismatch_word:
         print("Sample mismatches (up to 10):")
-        for r in mismatches[:10]:
-            print(r)
+        mismatches = (x for x, bit in enumerate(bin(mismatch_word)[:1:-1]) if bit == "1")
+        print("\n".join(str(simulate_once(x)) for x in islice(mismatches, 10)))
     else:
         print("All combinations matched.")
 
     # Error count by HW
-    by_hw = defaultdict(lambda: {"total": 0, "errors": 0})
-    for r in rows:
-        h = r["HW"]
-        by_hw[h]["total"] += 1
-        if not r["match"]:
-            by_hw[h]["errors"] += 1
-
     print("\nError count by HW:")
-    for h in range(0, m+1):
-        print(f"HW={h}: {by_hw[h]['errors']} errors out of {by_hw[h]['total']}")
+    print("\n".join(f"HW={h}: {(exact[h] & mismatch_word).bit_count()} errors out of {exact[h].bit_count()}"
+                    for h in range(0, m+1)))
 
     if print_all:
+        # One buffered write for the whole dump instead of 2^m print() calls
         print("\nAll rows:")
-        for r in rows:
-            print(r)
+        print("\n".join(str(simulate_once(x)) for x in xs))
 
 if __name__ == "__main__":
     # Set verbose=True to see parameters; print_all=True to dump all rows
@@ -1,13 +1,9 @@
-import math
-
 def compute_folded_bias(n_values):
     print(f"{'n':>5} | {'th':>5} | {'w':>5} | {'2^w':>5} | {'K':>10} | {'K (bin)':>15}")
     print("-" * 55)
     for n in n_values:
         th = (n + 1) // 2  # Majority threshold = ceil(n/2)
-        w = math.ceil(math.log2(th))  # minimal w so that 2^w >= th
-        while (1 << w) <= (th - 1):  # ensure 2^w > th-1
-            w += 1
+        w = (th - 1).bit_length()  # minimal w so that 2^w > th-1
         two_pow_w = 1 << w
         K = two_pow_w - th
         print(f"{n:5d} | {th:5d} | {w:5d} | {two_pow_w:5d} | {K:10d} | {bin(K):>15}")
@@ -35,38 +35,46 @@ INCLUDE_BASELINE_STRICT   = True   # maj_baseline_strict_<n>
 MAJ_ONLY_FA = True
 # ===================================================
 
-import os, math
-from collections import defaultdict, deque
+import os
+from functools import lru_cache
+from itertools import chain, product
 
 # ---------- common helpers ----------
+@lru_cache(maxsize=256)
 def _verilog_header(n, title):
-    return [
+    return (
         f"// -----------------------------------------------------------------------------",
         f"// {title}",
         f"// n = {n}",
         f"// Expect FA primitive: module fa(input a,b,cin, output sum,cout);",
         f"// -----------------------------------------------------------------------------",
-        ""
-    ]
+        "",
+    )
+
+
+@lru_cache(maxsize=256)
+def _bit_params(n):
+    """Return (th, w, K, p, N, m, th_N) for an n-input majority."""
+    th   = (n + 1) // 2
+    w    = (th - 1).bit_length()   # ceil(log2(th))
+    K    = (1 << w) - th
+    p    = n.bit_length()          # ceil(log2(n+1))
+    N    = (1 << p) - 1            # scaffold input count (2^p - 1)
+    m    = p                       # comparator width so that 2^m = N + 1
+    th_N = (N + 1) // 2            # majority threshold for the scaffold
+    return th, w, K, p, N, m, th_N
 
 
 def _fa_max_levels(fa_ops):
     """Return the maximum FA level depth in a sequential FA list."""
-    if not fa_ops:
-        return 0
-
+    # Ops are topologically ordered, so a single forward pass sees every input's
+    # level first; inputs and constants (never stored) are level 0.
     levels = {}
-
-    def get_level(sig):
-        if sig in ("1'b0", "1'b1", None):
-            return 0
-        return levels.get(sig, 0)
-
+    get = levels.get
     max_level = 0
     for a, b, cin, s, k in fa_ops:
-        curr = max(get_level(a), get_level(b), get_level(cin)) + 1
-        levels[s] = curr
-        levels[k] = curr
+        curr = max(get(a, 0), get(b, 0), get(cin, 0)) + 1
+        levels[s] = levels[k] = curr
         if curr > max_level:
             max_level = curr
     return max_level
@@ -77,16 +85,19 @@ def csa_macro_schedule_all_columns(raw_inputs, const_names_per_col):
     Build a CSA macro tree:
       Stage A (col 0): only RAW input triples -> (s@0, c@1)
       Stage B (col 0): fold [sums + leftover raw + const@0...] -> ONE bit; carries -> col 1
-      Columns 1..: fold each column j to ONE bit (serial chain); carries -> j+1
+      Columns 1..: fold each column j to ONE bit (balanced triples); carries -> j+1
+    const_names_per_col is a list indexed by column (empty/missing = no constants).
     Returns:
       ops             : list[(col, kind, a,b,cin, s,k)]  // FA instances
       wires           : list[(s,k)]                      // wire names to declare
       residual_by_col : {col: residual_bit_name}        // final single bit per column
       const_decl      : list[str]                        // const wires to declare (e.g., K0..)
+      last_k_at_col   : {col: carry_name}               // last carry created in each column
     """
     fa_id = 0
     ops   = []
     wires = []
+    last_k_at_col = {}
 
     def new_wires(col, tag=""):
         nonlocal fa_id
@@ -94,47 +105,63 @@ def csa_macro_schedule_all_columns(raw_inputs, const_names_per_col):
         k = f"{tag}c_c{col}_{fa_id}"
         fa_id += 1
         wires.append((s, k))
+        last_k_at_col[col] = k
         return s, k
 
+    # Columns are plain lists indexed by column. The total input weight bounds
+    # the highest column a carry can reach, so the list is sized once up front.
+    weight = len(raw_inputs) + sum(len(v) << j for j, v in enumerate(const_names_per_col))
+    n_cols = max(weight.bit_length(), len(const_names_per_col)) + 1
+    col_bits = [[] for _ in range(n_cols)]
+    consts = list(const_names_per_col) + [()] * (n_cols - len(const_names_per_col))
+
     # ---- Stage A: RAW triples at col 0 ----
     raw = list(raw_inputs)
-    col0_sums = deque()
-    col_bits  = {1: deque()}  # carries from col 0 land here
+    col0_sums = []
 
-    while len(raw) >= 3:
-        a = raw.pop(0); b = raw.pop(0); c = raw.pop(0)
+    i = 0
+    while i + 3 <= len(raw):
+        a, b, c = raw[i], raw[i + 1], raw[i + 2]
+        i += 3
         s, k = new_wires(0, "raw_")
         ops.append((0, "raw_triple", a, b, c, s, k))
         col0_sums.append(s)
-        col_bits[1].append(k)
+        col_bits[1].append(k)  # carries from col 0 land here
 
     # ---- Stage B: fold col 0 to ONE bit (include constants at col 0 if any) ----
-    col0_queue = deque(list(col0_sums) + raw)
+    col0_queue = col0_sums + raw[i:]
     const_decl = []
-    for cname in const_names_per_col.get(0, []):
+    for cname in consts[0]:
         col0_queue.append(cname)
         const_decl.append(cname)
 
     residual_by_col = {}
 
     def fold_column(col, queue):
+        # Balanced (Wallace-style) fold: each level takes disjoint triples in
+        # parallel, so depth is ~log1.5(len) instead of a len/2 serial chain.
+        # Same FA count as a chain: every triple removes two bits.
         carries_out = []
         if not queue:
             return None, carries_out
 
-        acc = queue.popleft()
-        while len(queue) >= 2:
-            b = queue.popleft()
-            c = queue.popleft()
-            s, k = new_wires(col, "")
-            ops.append((col, "triple", acc, b, c, s, k))
-            carries_out.append(k)
-            acc = s
-
-        if len(queue) == 1:
-            b = queue.popleft()
+        while len(queue) >= 3:
+            next_level = []
+            i = 0
+            while i + 3 <= len(queue):
+                a, b, c = queue[i], queue[i + 1], queue[i + 2]
+                i += 3
+                s, k = new_wires(col, "")
+                ops.append((col, "triple", a, b, c, s, k))
+                carries_out.append(k)
+                next_level.append(s)
+            next_level.extend(queue[i:])
+            queue = next_level
+
+        acc = queue[0]
+        if len(queue) == 2:
             s, k = new_wires(col, "p_")
-            ops.append((col, "pair", acc, b, "1'b0", s, k))
+            ops.append((col, "pair", acc, queue[1], "1'b0", s, k))
             carries_out.append(k)
             acc = s
 
@@ -144,83 +171,101 @@ def csa_macro_schedule_all_columns(raw_inputs, const_names_per_col):
     res0, carries_to_1 = fold_column(0, col0_queue)
     if res0 is not None:
         residual_by_col[0] = res0
-    for k in carries_to_1:
-        col_bits.setdefault(1, deque()).append(k)
+    col_bits[1].extend(carries_to_1)
 
     # ---- Columns 1.. : fold each to ONE bit; push carries upward ----
-    pending_cols = set(col_bits.keys()) | set(const_names_per_col.keys())
-    current = 1
-    while True:
-        candidates = [c for c in pending_cols if c >= current and (
-            (c in col_bits and len(col_bits[c]) > 0) or (c in const_names_per_col and len(const_names_per_col[c]) > 0)
-        )]
-        if not candidates:
-            break
-        j = min(candidates)
-
-        qj = col_bits.get(j, deque())
-        if j in const_names_per_col:
-            for cname in const_names_per_col[j]:
-                qj.append(cname)
-                const_decl.append(cname)
+    # Columns only ever feed the next one up, so a single upward walk visits
+    # them in order; empty columns fold to nothing.
+    for j in range(1, n_cols):
+        qj = col_bits[j]
+        for cname in consts[j]:
+            qj.append(cname)
+            const_decl.append(cname)
 
         residual_j, carries_to_next = fold_column(j, qj)
         if residual_j is not None:
             residual_by_col[j] = residual_j
         if carries_to_next:
-            col_bits.setdefault(j+1, deque()).extend(carries_to_next)
-            pending_cols.add(j+1)
+            col_bits[j + 1].extend(carries_to_next)
+        col_bits[j] = []
 
-        # mark processed
-        if j in col_bits: col_bits[j] = deque()
-        if j in const_names_per_col: const_names_per_col[j] = []
-        current = j + 1
-
-    return ops, wires, residual_by_col, const_decl
+    return ops, wires, residual_by_col, const_decl, last_k_at_col
 
 
 # ---------- scaffold + reduction helpers ----------
-def _is_const(sig: str) -> bool:
-    return sig in ("1'b0", "1'b1")
+class SignalTable:
+    """Intern signal names as small int IDs; 1'b0/1'b1 are always IDs 0/1."""
+
+    def __init__(self):
+        self.names = ["1'b0", "1'b1"]
+        self.ids = {"1'b0": 0, "1'b1": 1}
+
+    def intern(self, name: str) -> int:
+        sid = self.ids.get(name)
+        if sid is None:
+            sid = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return sid
 
+    def name(self, sid: int) -> str:
+        return self.names[sid]
 
-def _prune_fa_netlist(fa_ops, maj_signal):
-    needed = {maj_signal}
-    pruned_rev = []
-    for a, b, cin, s, k in reversed(fa_ops):
-        if s in needed or k in needed:
-            pruned_rev.append((a, b, cin, s, k))
-            for sig in (a, b, cin):
-                if not _is_const(sig):
-                    needed.add(sig)
-    return list(reversed(pruned_rev))
+    def __len__(self):
+        return len(self.names)
+
+
+def _is_const(sig: int) -> bool:
+    return sig < 2
+
+
+def _prune_fa_netlist(fa_ops, maj_signal, n_sigs):
+    """fa_ops/maj_signal are SignalTable IDs below n_sigs."""
+    reachable = bytearray(n_sigs)
+    reachable[maj_signal] = 1
+    keep = bytearray(len(fa_ops))
+    for i in range(len(fa_ops) - 1, -1, -1):
+        a, b, cin, s, k = fa_ops[i]
+        if reachable[s] or reachable[k]:
+            keep[i] = 1
+            reachable[a] = reachable[b] = reachable[cin] = 1
+    return [op for op, kept in zip(fa_ops, keep) if kept]
 
 
 def _constant_fold_and_prune(fa_ops, maj_signal):
-    const_map = {}
+    table = SignalTable()
+    intern = table.intern
 
-    def resolve(sig):
-        while sig in const_map:
-            sig = const_map[sig]
-        return sig
+    # parent[sig] is the signal it resolves to. Folded outputs always point
+    # straight at a constant, so one lookup resolves any signal. Ops arrive in
+    # topological order, so an op's inputs are final by the time it is seen and
+    # one forward pass both folds and rewrites.
+    parent = [0, 1]
+
+    def lookup(sig):
+        sid = intern(sig)
+        if sid == len(parent):
+            parent.append(sid)
+        return parent[sid]
 
-    processed = []
+    folded = []
     for a, b, cin, s, k in fa_ops:
-        a = resolve(a); b = resolve(b); cin = resolve(cin)
+        a = lookup(a); b = lookup(b); cin = lookup(cin)
+        s = lookup(s); k = lookup(k)
         if _is_const(a) and _is_const(b) and _is_const(cin):
-            ones = (a == "1'b1") + (b == "1'b1") + (cin == "1'b1")
-            const_map[s] = "1'b1" if (ones & 1) else "1'b0"
-            const_map[k] = "1'b1" if ones >= 2 else "1'b0"
+            ones = a + b + cin
+            parent[s] = ones & 1
+            parent[k] = 1 if ones >= 2 else 0
             continue
-        processed.append((a, b, cin, s, k))
+        folded.append((a, b, cin, s, k))
 
-    maj_signal = resolve(maj_signal)
-    folded = []
-    for a, b, cin, s, k in processed:
-        folded.append((resolve(a), resolve(b), resolve(cin), resolve(s), resolve(k)))
+    maj_id = lookup(maj_signal)
+    folded = _prune_fa_netlist(folded, maj_id, len(table))
 
-    folded = _prune_fa_netlist(folded, maj_signal)
-    return folded, maj_signal
+    names = table.names
+    return (
+        [(names[a], names[b], names[cin], names[s], names[k]) for a, b, cin, s, k in folded],
+        names[maj_id],
+    )
 
 
 def _collect_const_names(fa_ops, maj_signal, candidates):
@@ -241,82 +286,50 @@ def _prepare_for_emit(fa_ops, maj_signal, const_candidates):
     return fa_ops_prepped, maj_signal_prepped, const_used
 
 # ======== 1) Proposed: Folded-Bias (CSA-only to bit w) ========
-def emit_folded_bias(n: int):
+@lru_cache(maxsize=64)
+def _folded_bias_ops(n: int):
     """
-    CSA-only up to bit (w-1). Majority decision is the carry into 2^w
-    (the last cout created at column w-1). No finishing CPA.
+    CSA schedule shared by the folded-bias Verilog and BLIF paths.
+    Returns (ops, wires, const1_names, maj_out, w, K); sequences are tuples
+    since the result is cached.
     """
-    assert n % 2 == 1 and n >= 3
-    th = (n + 1) // 2
-    w  = math.ceil(math.log2(th))
-    K  = (1 << w) - th
+    th, w, K = _bit_params(n)[:3]
 
     # Build K constants per column < w
-    consts = defaultdict(list)
-    for j in range(w):
-        if ((K >> j) & 1) == 1:
-            consts[j].append(f"K{j}")
+    consts = [[f"K{j}"] if ((K >> j) & 1) == 1 else [] for j in range(w)]
 
     # Run CSA macro
     raw_inputs = [f"x[{i}]" for i in range(n)]
-    ops, wires, residual_by_col, const_decl = csa_macro_schedule_all_columns(raw_inputs, consts)
-
-    # Extract final maj bit (last carry produced at column w-1)
-    # Re-simulate the last column cheaply:
-    # Build the column queue again to learn last cout
-    from collections import deque as _dq
-    col_bits = defaultdict(_dq)
-    # collect carries from ops by column
-    for col, kind, a, b, cin, s, k in ops:
-        if col+1 >= 1:
-            col_bits[col+1].append(k)
-    # inject Ks
-    if w > 0:
-        for j in range(w):
-            if ((K >> j) & 1) == 1:
-                col_bits[j].append(f"K{j}")
-    # last column is (w-1)
-    last_cout = None
-    def fold_for_last(queue):
-        nonlocal last_cout
-        if not queue: return
-        acc = queue.popleft()
-        while len(queue) >= 2:
-            queue.popleft(); queue.popleft()
-            last_cout = "temp_carry"  # just mark something non-None
-        if len(queue) == 1:
-            queue.popleft()
-            last_cout = "temp_carry"
-
-    if w == 0:
-        maj_cout = "1'b0"
-    else:
-        q = _dq(col_bits.get(w-1, []))
-        fold_for_last(q)
-        # We don’t know the exact name without replaying IDs; use a robust rule:
-        # In our ops list, the largest FA id at column (w-1) produced the last carry.
-        last_k = None
-        for col, kind, a, b, cin, s, k in ops:
-            if col == (w-1):
-                last_k = k
-        maj_cout = last_k if last_k is not None else "1'b0"
+    ops, wires, _, _, last_k_at_col = csa_macro_schedule_all_columns(raw_inputs, consts)
+    const1_names = tuple(f"K{j}" for j in range(w) if ((K >> j) & 1) == 1)
+
+    # Final maj bit is the last carry produced at column w-1
+    maj_out = last_k_at_col.get(w - 1, "1'b0")
+    return tuple(ops), tuple(wires), const1_names, maj_out, w, K
+
+
+def emit_folded_bias(n: int):
+    """
+    CSA-only up to bit (w-1). Majority decision is the carry into 2^w
+    (the last cout created at column w-1). No finishing CPA.
+    """
+    assert n % 2 == 1 and n >= 3
+    th = _bit_params(n)[0]
+    ops, wires, const1_names, maj_cout, w, K = _folded_bias_ops(n)
 
     # Verilog (unchanged behavior)
     lines = []
     lines += _verilog_header(n, "Folded-Bias Majority (CSA-only, macro-structured)")
     lines.append(f"module maj_fb_{n} (input  wire [{n-1}:0] x, output wire maj);")
     lines.append(f"  // Parameters: th={th}, w={w}, K={K}")
-    for j in range(w):
-        if ((K >> j) & 1) == 1:
-            lines.append(f"  wire K{j} = 1'b1;")
+    lines.extend(f"  wire K{j} = 1'b1;" for j in range(w) if ((K >> j) & 1) == 1)
 
     if ops:
         lines.append("")
         lines.append("  // -------- CSA macro schedule --------")
-        for (s,k) in wires:
-            lines.append(f"  wire {s}, {k};")
-        for (col, kind, a, b, cin, s, k) in ops:
-            lines.append(f"  fa u_c{col}_{kind}_{s}(.a({a}), .b({b}), .cin({cin}), .sum({s}), .cout({k}));")
+        lines.extend(f"  wire {s}, {k};" for s, k in wires)
+        lines.extend(f"  fa u_c{col}_{kind}_{s}(.a({a}), .b({b}), .cin({cin}), .sum({s}), .cout({k}));"
+                     for col, kind, a, b, cin, s, k in ops)
 
     lines.append("")
     lines.append(f"  assign maj = {maj_cout};")
@@ -336,26 +349,32 @@ def emit_folded_bias(n: int):
         "maj_signal": maj_cout,
     }
 
-    return "\n".join(lines), len(ops), ops, [f"K{j}" for j in range(w) if ((K >> j) & 1) == 1], maj_cout, stats
+    return "\n".join(lines), len(ops), list(ops), list(const1_names), maj_cout, stats
 
 
 # ======== 2) Baseline STRICT (paper scaffold) ========
-def emit_baseline_strict(n: int):
+def _build_cpa_ops(m, hw_bits, th_N):
     """
-    Literal paper flow:
-      * Embed Maj_n into Maj_N with N = 2^p - 1 (p = ceil(log2(n+1))).
-      * Fix (n_big - k) inputs to 1 and (n_big - k) inputs to 0 so the scaffold
-        still has N inputs, where n_big = (N-1)//2 and k=(n-1)//2.
-      * Build CSA HW tree on those N inputs.
-      * Compare HW against Maj_N threshold by adding (th_N - 1) with Cin=1 and
-        reading the final carry (overflow).
+    Ripple comparator HW + (th_N - 1) + Cin=1 over m bits; a-inputs are hw_bits.
+    Returns (fa_ops, const1_names) with const1_names = [c2_0, T<j> for set bits].
     """
-    assert n % 2 == 1 and n >= 3
+    th_mask = th_N - 1
+    fa_ops = [
+        (hw_bits[i], f"T{i}" if (th_mask >> i) & 1 else "1'b0", f"c2_{i}", f"s2_{i}", f"c2_{i+1}")
+        for i in range(m)
+    ]
+    const1_names = ["c2_0"] + [f"T{j}" for j in range(m) if (th_mask >> j) & 1]
+    return fa_ops, const1_names
+
 
-    p       = math.ceil(math.log2(n + 1))
-    N       = (1 << p) - 1                    # scaffold input count (2^p - 1)
-    m       = p                               # comparator width so that 2^m = N + 1
-    th_N    = (N + 1) // 2                    # majority threshold for the scaffold
+@lru_cache(maxsize=64)
+def _baseline_strict_csa(n: int):
+    """
+    Scaffold CSA shared by the baseline Verilog and BLIF paths.
+    Returns (ops, wires, hw_bits, num_fix); sequences are tuples since the
+    result is cached.
+    """
+    p, N, m, th_N = _bit_params(n)[3:]
     k       = (n - 1) // 2
     n_big   = (N - 1) // 2
     num_fix = n_big - k                       # number of paired 1/0 constants to add
@@ -366,11 +385,28 @@ def emit_baseline_strict(n: int):
     hw_inputs += ["1'b1"] * num_fix
     hw_inputs += ["1'b0"] * num_fix
 
-    consts = defaultdict(list)  # no per-column constants in baseline
-    ops, wires, residual_by_col, _ = csa_macro_schedule_all_columns(hw_inputs, consts)
-    hw_bits = [residual_by_col.get(i, "1'b0") for i in range(m)]
+    consts = []  # no per-column constants in baseline
+    ops, wires, residual_by_col, _, _ = csa_macro_schedule_all_columns(hw_inputs, consts)
+    hw_bits = tuple(residual_by_col.get(i, "1'b0") for i in range(m))
+    return tuple(ops), tuple(wires), hw_bits, num_fix
+
+
+def emit_baseline_strict(n: int):
+    """
+    Literal paper flow:
+      * Embed Maj_n into Maj_N with N = 2^p - 1 (p = ceil(log2(n+1))).
+      * Fix (n_big - k) inputs to 1 and (n_big - k) inputs to 0 so the scaffold
+        still has N inputs, where n_big = (N-1)//2 and k=(n-1)//2.
+      * Build CSA HW tree on those N inputs.
+      * Compare HW against Maj_N threshold by adding (th_N - 1) with Cin=1 and
+        reading the final carry (overflow).
+    """
+    assert n % 2 == 1 and n >= 3
+
+    p, N, m, th_N = _bit_params(n)[3:]
+    ops, wires, hw_bits, num_fix = _baseline_strict_csa(n)
 
-    th_mask_bits = [((th_N - 1) >> j) & 1 for j in range(m)]
+    cpa_ops, const1_names = _build_cpa_ops(m, [f"hw_{i}" for i in range(m)], th_N)
 
     lines = []
     lines += _verilog_header(n, "Baseline STRICT (paper scaffold): CSA (N=2^p-1) → HW + th_N - 1 + Cin")
@@ -380,30 +416,26 @@ def emit_baseline_strict(n: int):
     if ops:
         lines.append("")
         lines.append("  // -------- CSA macro schedule on scaffold inputs --------")
-        for (s, ksig) in wires:
-            lines.append(f"  wire {s}, {ksig};")
-        for (col, kind, a, b, cin, s, ksig) in ops:
-            lines.append(f"  fa u_c{col}_{kind}_{s}(.a({a}), .b({b}), .cin({cin}), .sum({s}), .cout({ksig}));")
+        lines.extend(f"  wire {s}, {ksig};" for s, ksig in wires)
+        lines.extend(f"  fa u_c{col}_{kind}_{s}(.a({a}), .b({b}), .cin({cin}), .sum({s}), .cout({ksig}));"
+                     for col, kind, a, b, cin, s, ksig in ops)
 
     lines.append("")
     lines.append("  // -------- HW bits after CSA (single-rail) --------")
-    for i in range(m):
-        lines.append(f"  wire hw_{i} = {hw_bits[i]};")
+    lines.extend(f"  wire hw_{i} = {hw_bits[i]};" for i in range(m))
 
-    if any(th_mask_bits):
+    if len(const1_names) > 1:
         lines.append("")
         lines.append("  // Threshold constant bits (th_N - 1)")
-        for j, bit in enumerate(th_mask_bits):
-            if bit:
-                lines.append(f"  wire T{j} = 1'b1;")
+        lines.extend(f"  wire {t} = 1'b1;" for t in const1_names[1:])
 
     lines.append("")
     lines.append("  // -------- Full ripple (m bits) for HW + (th_N - 1) + Cin=1 --------")
     lines.append("  wire c2_0 = 1'b1; // Cin = 1 (paper comparator)")
-    for i in range(m):
-        b_term = f"T{i}" if th_mask_bits[i] else "1'b0"
-        lines.append(f"  wire s2_{i}, c2_{i+1};")
-        lines.append(f"  fa u_th_{i}(.a(hw_{i}), .b({b_term}), .cin(c2_{i}), .sum(s2_{i}), .cout(c2_{i+1}));")
+    lines.extend(line for i, (a, b, cin, s, c) in enumerate(cpa_ops) for line in (
+        f"  wire {s}, {c};",
+        f"  fa u_th_{i}(.a({a}), .b({b}), .cin({cin}), .sum({s}), .cout({c}));",
+    ))
 
     lines.append(f"  wire c2_m = c2_{m};")
     lines.append("")
@@ -415,17 +447,9 @@ def emit_baseline_strict(n: int):
     lines.append(f"// FA count (baseline STRICT, scaffold) for n={n}: CSA={len(ops)}, CPA(th)={m}, total={total_fas}")
 
     # Collect FA ops (CSA + comparator) for optional BLIF logging
-    fa_ops = [(a, b, cin, s, ksig) for (_, _, a, b, cin, s, ksig) in ops]
-    for i in range(m):
-        a   = f"hw_{i}"
-        b   = f"T{i}" if th_mask_bits[i] else "1'b0"
-        cin = f"c2_{i}" if i > 0 else "c2_0"
-        s   = f"s2_{i}"
-        c   = f"c2_{i+1}"
-        fa_ops.append((a, b, cin, s, c))
+    fa_ops = [(a, b, cin, s, ksig) for (_, _, a, b, cin, s, ksig) in ops] + cpa_ops
 
     maj_out = f"c2_{m}"
-    const1_names = ["c2_0"] + [f"T{j}" for j, bit in enumerate(th_mask_bits) if bit]
     csa_levels = _fa_max_levels([(a, b, cin, s, k) for (_, _, a, b, cin, s, k) in ops])
     total_levels = csa_levels + m  # ripple comparator adds m sequential FA levels
 
@@ -449,27 +473,72 @@ def emit_baseline_strict(n: int):
     return '\n'.join(lines), total_fas, fa_ops, const1_names, maj_out, stats
 
 # ========================= BLIF SUPPORT (Canonical) =========================
+_SANITIZE_TABLE = str.maketrans({'[': None, ']': None, ' ': '_', '.': '_'})
+
+@lru_cache(maxsize=1 << 15)
 def _sanitize(sig: str) -> str:
     """Make signal names BLIF-safe: x[3]->x3; keep 1'b0/1'b1 literal."""
     if sig in ("1'b0", "1'b1"):
         return sig
-    return sig.replace('[','').replace(']','').replace(' ','_').replace('.', '_')
+    return sig.translate(_SANITIZE_TABLE)
+
+def _build_sorted3_lut():
+    # perm only depends on how a,b,c compare pairwise (ties included), so one
+    # representative triple over {0,1,2} per comparison pattern fills the table
+    lut = {}
+    for a, b, c in product(range(3), repeat=3):
+        lst = [a, b, c]
+        key = ((a > b) - (a < b), (a > c) - (a < c), (b > c) - (b < c))
+        lut[key] = tuple(lst.index(v) for v in sorted(lst))  # new_index -> old_index
+    return lut
+
+_SORTED3_PERM = _build_sorted3_lut()
 
 def _sorted3(a,b,c):
     """Return tuple of three signal names sorted alphabetically, and their permutation map."""
-    lst = [a,b,c]
-    srt = sorted(lst)
-    perm = tuple(lst.index(srt[i]) for i in range(3))  # new_index -> old_index
-    return tuple(srt), perm
+    perm = _SORTED3_PERM[((a > b) - (a < b), (a > c) - (a < c), (b > c) - (b < c))]
+    lst = (a, b, c)
+    return (lst[perm[0]], lst[perm[1]], lst[perm[2]]), perm
 
 def _permute_pattern(p, perm):
     """Permute a 3-bit pattern 'p' according to perm (length 3)."""
     if len(p) != 3: return p
     return "".join(p[perm[i]] for i in range(3))
 
+@lru_cache(maxsize=None)
+def _maj3_rows(mask_sorted):
+    """'abc 1' cover rows of MAJ3 over sorted inputs, with input i inverted where mask_sorted[i]."""
+    rows = []
+    for a in (0, 1):
+        for b in (0, 1):
+            for c in (0, 1):
+                adjusted = (a ^ mask_sorted[0]) + (b ^ mask_sorted[1]) + (c ^ mask_sorted[2])
+                if adjusted >= 2:
+                    rows.append(f"{a}{b}{c}")
+    return tuple(f"{r} 1" for r in sorted(set(rows)))
+
+@lru_cache(maxsize=None)
+def _xor3_rows(perm):
+    """'abc 1' cover rows of XOR3 (odd parity: 001,010,100,111) permuted to the sorted input order."""
+    return tuple(f"{_permute_pattern(r, perm)} 1" for r in ("001", "010", "100", "111"))
+
 def _emit_names_lines_for_const1(name):
     return [f".names {name}", "1"]
 
+_BLIF_CHUNK_LINES = 4096
+
+@lru_cache(maxsize=None)
+def _ensure_dir(dirname):
+    """Create an output directory once per run; later writes to it skip the mkdir."""
+    os.makedirs(dirname, exist_ok=True)
+
+def _write_fd(fd, data):
+    """os.write can return short; keep writing until the whole buffer is out."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
 def _write_blif_from_fas_canonical(model_name, n, fa_ops, maj_signal, const1_names, path, maj_only=True):
     """
     Emit canonical BLIF:
@@ -480,91 +549,98 @@ def _write_blif_from_fas_canonical(model_name, n, fa_ops, maj_signal, const1_nam
       - maj_only=True  -> 3x MAJ + 2x NOT per FA (cout MAJ(A,B,C); sum = MAJ(MAJ(~A,B,C), A, ~cout))
       - maj_only=False -> sum as XOR3; cout as MAJ3
     """
-    inputs = [f"x{i}" for i in range(n)]
-    out = [f".model {model_name}"]
-    if inputs: out.append(".inputs " + " ".join(inputs))
-    out.append(".outputs maj")
-
-    used_const0 = False
-    used_const1 = False
-
-    # Named const-1 declarations
-    const1_set = set()
-    for k in (const1_names or []):
-        ksan = _sanitize(k)
-        if ksan not in const1_set:
-            const1_set.add(ksan)
-            out.extend(_emit_names_lines_for_const1(ksan))
-
-    def map_in(sig):
-        nonlocal used_const0, used_const1
-        s = _sanitize(sig)
-        if s == "1'b0":
-            used_const0 = True
-            return "CONST0"
-        if s == "1'b1":
-            used_const1 = True
-            return "CONST1"
-        if "[" in sig:
-            return s.replace("[","").replace("]","")
-        return s
-
-    def emit_maj3(A,B,C,OUT, mask=None):
-        na, nb, nc = (False, False, False) if mask is None else mask
-        (A1,B1,C1), perm = _sorted3(A,B,C)
-        mask_orig = [na, nb, nc]
-        mask_sorted = [mask_orig[perm_idx] for perm_idx in perm]
-
-        rows = []
-        for a in (0, 1):
-            for b in (0, 1):
-                for c in (0, 1):
-                    adjusted = (a ^ mask_sorted[0]) + (b ^ mask_sorted[1]) + (c ^ mask_sorted[2])
-                    if adjusted >= 2:
-                        rows.append(f"{a}{b}{c}")
-
-        rows = sorted(set(rows))
-        out.append(f".names {A1} {B1} {C1} {OUT}")
-        for r in rows:
-            out.append(f"{r} 1")
-
-    def emit_xor3(A,B,C,S):
-        # XOR3 canonical minterms (odd parity): 001,010,100,111
-        (A1,B1,C1), perm = _sorted3(A,B,C)
-        rows = ["001","010","100","111"]
-        rows = [_permute_pattern(r, perm) for r in rows]
-        out.append(f".names {A1} {B1} {C1} {S}")
-        for r in rows:
-            out.append(f"{r} 1")
-
-    # Expand each FA
-    for i,(a,b,cin,s,k) in enumerate(fa_ops):
-        A = map_in(a); B = map_in(b); C = map_in(cin)
-        S = _sanitize(s); K = _sanitize(k)
-
-        if maj_only:
-            # MAJ-only FA without explicit NOT nodes
-            emit_maj3(A,B,C,K)
-            op1  = f"fa{i}_op1";  emit_maj3(A,B,C,op1, mask=(True, False, False))
-            emit_maj3(op1,A,K,S, mask=(False, False, True))
-        else:
-            emit_xor3(A,B,C,S)                 # sum
-            emit_maj3(A,B,C,K)                 # cout
-
-    # Literal constants
-    if used_const1 and "CONST1" not in const1_set:
-        out.extend(_emit_names_lines_for_const1("CONST1"))
-    if used_const0:
-        out.append(".names CONST0")  # const-0, no cubes
-
-    # Connect top output
-    out.append(f".names {_sanitize(maj_signal)} maj")
-    out.append("1 1")
-    out.append(".end")
-
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        f.write("\n".join(out))
+    _ensure_dir(os.path.dirname(path))
+    # Unbuffered fd writes: each chunk is encoded once and handed straight to os.write
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        inputs = [f"x{i}" for i in range(n)]
+        out = [f".model {model_name}"]
+        if inputs: out.append(".inputs " + " ".join(inputs))
+        out.append(".outputs maj")
+
+        # Lines are written out in chunks as they are produced, so memory stays
+        # bounded by the chunk rather than the whole file. Chunks are joined with
+        # "\n" exactly as one "\n".join(out) would be.
+        sep = ""
+
+        def flush():
+            nonlocal sep
+            if out:
+                _write_fd(fd, (sep + "\n".join(out)).encode())
+                sep = "\n"
+                out.clear()
+
+        used_const0 = False
+        used_const1 = False
+
+        # Named const-1 declarations
+        const1_set = set()
+        for k in (const1_names or []):
+            ksan = _sanitize(k)
+            if ksan not in const1_set:
+                const1_set.add(ksan)
+                out.extend(_emit_names_lines_for_const1(ksan))
+
+        def map_in(sig):
+            nonlocal used_const0, used_const1
+            s = _sanitize(sig)
+            if s == "1'b0":
+                used_const0 = True
+                return "CONST0"
+            if s == "1'b1":
+                used_const1 = True
+                return "CONST1"
+            if "[" in sig:
+                return s.replace("[","").replace("]","")
+            return s
+
+        def emit_maj3(A,B,C,OUT, mask=None):
+            na, nb, nc = (False, False, False) if mask is None else mask
+            (A1,B1,C1), perm = _sorted3(A,B,C)
+            mask_orig = (na, nb, nc)
+            mask_sorted = tuple(mask_orig[perm_idx] for perm_idx in perm)
+            out.append(f".names {A1} {B1} {C1} {OUT}")
+            out.extend(_maj3_rows(mask_sorted))
+
+        append = out.append
+        extend = out.extend
+        maj_plain = _maj3_rows((False, False, False))
+
+        # Expand each FA. The cout gate and (MAJ-only) op1 gate / (XOR) sum gate
+        # share the same input triple, so it is sorted once per FA.
+        for i,(a,b,cin,s,k) in enumerate(fa_ops):
+            A = map_in(a); B = map_in(b); C = map_in(cin)
+            S = _sanitize(s); K = _sanitize(k)
+            (A1,B1,C1), perm = _sorted3(A,B,C)
+            head = f".names {A1} {B1} {C1} "
+
+            if maj_only:
+                # MAJ-only FA without explicit NOT nodes
+                append(head + K); extend(maj_plain)
+                op1 = f"fa{i}_op1"
+                append(head + op1); extend(_maj3_rows(tuple(perm_idx == 0 for perm_idx in perm)))  # ~A
+                emit_maj3(op1,A,K,S, mask=(False, False, True))
+            else:
+                # XOR3 canonical minterms (odd parity): 001,010,100,111
+                append(head + S); extend(_xor3_rows(perm))   # sum
+                append(head + K); extend(maj_plain)          # cout
+
+            if len(out) >= _BLIF_CHUNK_LINES:
+                flush()
+
+        # Literal constants
+        if used_const1 and "CONST1" not in const1_set:
+            out.extend(_emit_names_lines_for_const1("CONST1"))
+        if used_const0:
+            out.append(".names CONST0")  # const-0, no cubes
+
+        # Connect top output
+        out.append(f".names {_sanitize(maj_signal)} maj")
+        out.append("1 1")
+        out.append(".end")
+        flush()
+    finally:
+        os.close(fd)
 
 # ---------- build BLIF netlists from FA ops ----------
 def build_folded_bias_netlist(n: int):
@@ -575,126 +651,20 @@ def build_folded_bias_netlist(n: int):
     maj_out: signal name of the final majority decision (last cout at column w-1)
     """
     assert n % 2 == 1 and n >= 3
-    import math
-    from collections import deque, defaultdict
-
-    th = (n + 1) // 2
-    w  = math.ceil(math.log2(th))
-    K  = (1 << w) - th
-
-    const1_names = [f"K{j}" for j in range(w) if ((K >> j) & 1) == 1]
-
-    fa_id = 0
-    fa_ops = []
-    last_cout_wm1 = None  # <-- track the last carry created specifically at column (w-1)
-
-    def new_wires(col, tag=""):
-        nonlocal fa_id, last_cout_wm1
-        s = f"{tag}s_c{col}_{fa_id}"
-        k = f"{tag}c_c{col}_{fa_id}"
-        fa_id += 1
-        # remember the most recent carry created in column (w-1)
-        if col == (w - 1):
-            last_cout_wm1 = k
-        return s, k
-
-    raw = [f"x[{i}]" for i in range(n)]
-    col0_sums = deque()
-    col_bits  = {1: deque()}
-
-    # Stage A: raw triples at col 0
-    while len(raw) >= 3:
-        a = raw.pop(0); b = raw.pop(0); c = raw.pop(0)
-        s, k = new_wires(0, "raw_")
-        fa_ops.append((a, b, c, s, k))
-        col0_sums.append(s)
-        col_bits[1].append(k)
-
-    # Fold column 0 (+K0 if set)
-    col0_queue = deque(list(col0_sums) + raw)
-    if ((K >> 0) & 1) == 1:
-        col0_queue.append("K0")
-
-    def fold_column(col, queue):
-        if not queue:
-            return None, []
-        carries_out = []
-        acc = queue.popleft()
-        while len(queue) >= 2:
-            b = queue.popleft()
-            c = queue.popleft()
-            s, k = new_wires(col, "")
-            fa_ops.append((acc, b, c, s, k))
-            carries_out.append(k)
-            acc = s
-        if len(queue) == 1:
-            b = queue.popleft()
-            s, k = new_wires(col, "p_")
-            fa_ops.append((acc, b, "1'b0", s, k))
-            carries_out.append(k)
-            acc = s
-        return acc, carries_out
-
-    _, carries_to_1 = fold_column(0, col0_queue)
-    for k in carries_to_1:
-        col_bits.setdefault(1, deque()).append(k)
-
-    # Columns 1 .. w-2 (serial fold)
-    for j in range(1, max(1, w - 1)):
-        qj = col_bits.get(j, deque())
-        if ((K >> j) & 1) == 1:
-            qj.append(f"K{j}")
-        _, carries_to_next = fold_column(j, qj)
-        if carries_to_next:
-            col_bits.setdefault(j + 1, deque()).extend(carries_to_next)
-
-    # Final decision is the LAST carry created at column (w-1)
-    if w == 0:
-        maj_out = "1'b0"
-    else:
-        # Ensure we actually fold column (w-1) so last_cout_wm1 gets set when needed
-        q = col_bits.get(w - 1, deque())
-        if ((K >> (w - 1)) & 1) == 1:
-            q.append(f"K{w-1}")
-        # If there's work, perform one more fold to generate couts at col (w-1)
-        if len(q) >= 1:
-            _, _ = fold_column(w - 1, q)
-        maj_out = last_cout_wm1 if last_cout_wm1 is not None else "1'b0"
-
-    return fa_ops, const1_names, maj_out
+    ops, _, const1_names, maj_out, w, _ = _folded_bias_ops(n)
+    # Columns >= w only carry past the decision bit, so the netlist stops at w-1
+    fa_ops = [(a, b, cin, s, k) for (col, _, a, b, cin, s, k) in ops if col < w]
+    return fa_ops, list(const1_names), maj_out
 
 def build_baseline_strict_netlist(n: int):
     assert n % 2 == 1 and n >= 3
 
-    p       = math.ceil(math.log2(n + 1))
-    N       = (1 << p) - 1
-    m       = p
-    th_N    = (N + 1) // 2
-    k       = (n - 1) // 2
-    n_big   = (N - 1) // 2
-    num_fix = n_big - k
-    assert num_fix >= 0
-
-    hw_inputs = [f"x[{i}]" for i in range(n)]
-    hw_inputs += ["1'b1"] * num_fix
-    hw_inputs += ["1'b0"] * num_fix
-
-    consts = defaultdict(list)
-    ops, wires, residual_by_col, _ = csa_macro_schedule_all_columns(hw_inputs, consts)
-
-    fa_ops = [(a, b, cin, s, ksig) for (_, _, a, b, cin, s, ksig) in ops]
+    m, th_N = _bit_params(n)[5:]
+    ops, _, hw_bits, _ = _baseline_strict_csa(n)
 
-    th_mask_bits = [((th_N - 1) >> j) & 1 for j in range(m)]
-    hw_bits = [residual_by_col.get(i, "1'b0") for i in range(m)]
-    for i in range(m):
-        a   = hw_bits[i]
-        b   = f"T{i}" if th_mask_bits[i] else "1'b0"
-        cin = f"c2_{i}" if i > 0 else "c2_0"
-        s   = f"s2_{i}"
-        c   = f"c2_{i+1}"
-        fa_ops.append((a, b, cin, s, c))
+    cpa_ops, const1_names = _build_cpa_ops(m, hw_bits, th_N)
+    fa_ops = [(a, b, cin, s, ksig) for (_, _, a, b, cin, s, ksig) in ops] + cpa_ops
 
-    const1_names = ["c2_0"] + [f"T{j}" for j, bit in enumerate(th_mask_bits) if bit]
     maj_out = f"c2_{m}"
     return fa_ops, const1_names, maj_out
 
@@ -738,10 +708,13 @@ def main():
         counts.append(("baseline_strict", cnt_bs))
         bs_direct_data = build_baseline_strict_netlist(N)
 
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    _ensure_dir(OUTPUT_DIR)
     out_v = os.path.join(OUTPUT_DIR, OUTPUT_NAME)
-    with open(out_v, "w") as f:
-        f.write("\n".join(banner + modules))
+    with open(out_v, "w", buffering=1 << 20) as f:
+        # Same bytes as "\n".join(banner + modules), without building the joined copy
+        parts = chain(banner, modules)
+        f.write(next(parts))
+        f.writelines("\n" + part for part in parts)
     print("Wrote Verilog:", out_v)
     for name, cnt in counts:
         print(f"FA count [{name}]: {cnt}")
@@ -1,8 +1,7 @@
-import math
 from pathlib import Path
 
 def bits_needed(n: int) -> int:
-    return max(1, math.ceil(math.log2(n + 1)))
+    return max(1, n.bit_length())  # ceil(log2(n+1))
 
 def make_x_port_map_one_line(n: int) -> str:
     # ".x0(x[0]), .x1(x[1]), ..., .x<n-1>(x[n-1])"
@@ -15,17 +14,47 @@ def header_strings(n: int):
     dashes = "-" * len(title)
     return title, dashes
 
+def emit_popcount_wallace(n: int, cw: int):
+    """
+    CSA (Wallace) tree popcount of x. Returns (wire declaration lines, cw-bit
+    concatenation of the count). Each node is a 2-bit {carry,sum} of up to
+    three same-weight bits, so depth is O(log n) instead of an n-step loop.
+    """
+    cols = [[f"x[{i}]" for i in range(n)]]
+    lines = []
+    level = 0
+    while any(len(col) > 1 for col in cols):
+        nxt = [[] for _ in range(len(cols) + 1)]
+        idx = 0
+        for j, col in enumerate(cols):
+            i = 0
+            while len(col) - i >= 2:
+                grp = col[i:i + 3]
+                i += len(grp)
+                name = f"l{level}_{idx}"
+                idx += 1
+                lines.append(f"  wire [1:0] {name} = {' + '.join(grp)};")
+                nxt[j].append(f"{name}[0]")
+                nxt[j + 1].append(f"{name}[1]")
+            nxt[j].extend(col[i:])
+        cols = nxt if nxt[-1] else nxt[:-1]
+        level += 1
+    bits = [cols[j][0] if j < len(cols) and cols[j] else "1'b0" for j in range(cw)]
+    return lines, "{" + ", ".join(reversed(bits)) + "}"
+
 def gen_tb_top(n: int, module_name: str = "top") -> str:
     if n < 1:
         raise ValueError("n must be >= 1")
     # if n > :
     #     raise ValueError("n must be <= 63 so TOTAL_VECTORS fits in a 64-bit counter")
     cw = bits_needed(n)
-    th = math.ceil(n/2)
+    th = (n + 1) // 2
     total_vectors = 1 << n
 
     x_ports_one_line = make_x_port_map_one_line(n)
     title, dashes = header_strings(n)
+    tree_lines, hw_expr = emit_popcount_wallace(n, cw)
+    popcount_tree = "\n".join(tree_lines)
 
     # Produce the exact style you want
     tb = f"""`timescale 1ns/1ps
@@ -35,7 +64,6 @@ module tb_top;
   // {n}-bit input vector
   reg  [{n-1}:0] x = {n}'b0;
   wire       y0;
-  reg  [63:0] idx;
 
   // DUT instantiation
   {module_name} dut (
@@ -43,30 +71,25 @@ module tb_top;
     .y0(y0)
   );
 
-  // Optional reference function (majority reference for sanity check)
-  function [{cw-1}:0] popcount(input [{n-1}:0] v);
-    integer i; reg [{cw-1}:0] c;
-    begin
-      c = 0;
-      for (i = 0; i < {n}; i = i + 1)
-        c = c + v[i];
-      popcount = c;
-    end
-  endfunction
+  // Reference popcount as a CSA tree of {{carry,sum}} nodes
+{popcount_tree}
+  wire [{cw-1}:0] hw_ref = {hw_expr};
 
   // Reference majority: at least {th} ones
-  wire y_ref = (popcount(x) >= {th});
+  wire y_ref = (hw_ref >= {th});
 
   localparam [63:0] TOTAL_VECTORS = 64'd{total_vectors};
 
   initial begin
     $display("{title}");
     $display("{dashes}");
-    // Loop through all {1<<n} combinations
-    for (idx = 0; idx < TOTAL_VECTORS; idx = idx + 1) begin
-      x = idx[{n-1}:0];
+    // Step through all {1<<n} combinations (x starts at 0). Each vector is
+    // sampled 10 ns after it is applied, so a DUT with gate delays has settled
+    // and prints exactly once; x stops at all-ones instead of wrapping to 0.
+    repeat (TOTAL_VECTORS) begin
       #10 $display("%4t |  %b  |   %b       %b",
                    $time, x, y0, y_ref);
+      if (~&x) x = x + 1;
     end
     #10 $finish;
   end
@@ -74,7 +97,7 @@ module tb_top;
   // Optional mismatch check
   always #1 if (^x !== 1'bx && y0 !== y_ref)
     $display("Mismatch at t=%0t x=%b HW=%0d y0=%0b ref=%0b",
-             $time, x, popcount(x), y0, y_ref);
+             $time, x, hw_ref, y0, y_ref);
 
 endmodule
 
@@ -150,15 +173,18 @@ if __name__ == "__main__":
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
+    # Loop invariants: --out implies a single width, so its directory is made once here
+    fixed_path = None
+    if args.out:
+        fixed_path = Path(args.out)
+        if not fixed_path.is_absolute():
+            fixed_path = out_dir / fixed_path
+        fixed_path.parent.mkdir(parents=True, exist_ok=True)
+    template = "tb_top_{}.v"
+
     for width in widths:
         tb = gen_tb_top(width, module_name=args.module)
-        if args.out and len(widths) == 1:
-            out_path = Path(args.out)
-            if not out_path.is_absolute():
-                out_path = out_dir / out_path
-        else:
-            out_path = out_dir / f"tb_top_{width}.v"
-        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path = fixed_path or out_dir / template.format(width)
         with open(out_path, "w") as f:
             f.write(tb)
         print(f"✅ Wrote {out_path}")
@@ -19,16 +19,25 @@ from __future__ import annotations
 
 import argparse
 import re
+from itertools import chain
 from pathlib import Path
 from typing import Dict, List, Tuple
 
 
-INST_RE = re.compile(r"\bfa\s+(\w+)\s*\(([^;]+)\);")
 PIN_RE = re.compile(r"\.(\w+)\(([^)]+)\)")
-
-
-def sanitize_net(net: str) -> str:
-    return net.strip()
+# Pin order the project's emitters always use; anything else falls back to PIN_RE
+FA_PINS_CANON = re.compile(
+    r"\s*\.a\((?P<a>[^)]+)\)\s*,\s*\.b\((?P<b>[^)]+)\)\s*,\s*\.cin\((?P<cin>[^)]+)\)"
+    r"\s*,\s*\.sum\((?P<sum>[^)]+)\)\s*,\s*\.cout\((?P<cout>[^)]+)\)\s*"
+)
+OUT_DECL_RE = re.compile(r"output\s+wire\s+([^;]+);")
+IN_DECL_RE = re.compile(r"input\s+wire\s+([^;]+);")
+# One alternation over the body: fa instances, assigns and wire declarations
+MODULE_ITEM_RE = re.compile(
+    r"\bfa\s+(?P<inst>\w+)\s*\((?P<pins>[^;]+)\);"
+    r"|assign\s+(?P<assign>[^;]+);"
+    r"|wire\s+(?P<wire>[^;]+);"
+)
 
 
 def expand_bus(decl: str, name: str) -> List[str]:
@@ -99,38 +108,39 @@ def parse_verilog(path: Path, top: str | None = None) -> Tuple[str, Dict[str, Di
         else:
             outputs.append(name.rstrip(")"))
 
-    # Outputs declared later
-    for line in re.findall(r"output\s+wire\s+[^;]+;", module_body):
-        names = line.split()[2:]
-        for name in "".join(names).split(","):
-            name = sanitize_net(name.strip().strip(";"))
-            if name and name not in outputs:
-                outputs.append(name)
-
-    # Inputs declared later
-    for line in re.findall(r"input\s+wire\s+[^;]+;", module_body):
-        names = line.split()[2:]
-        for name in "".join(names).split(","):
-            name = sanitize_net(name.strip().strip(";"))
-            if name and name not in inputs:
-                inputs.append(name)
-
-    # Wire aliases and constants
-    for line in re.findall(r"wire\s+[^;]+;", module_body):
-        line = line.strip().strip(";")
-        if "=" in line:
-            lhs, rhs = line.replace("wire", "", 1).split("=")
-            lhs = sanitize_net(lhs.strip())
-            rhs = sanitize_net(rhs.strip())
-            if rhs in ("1'b0", "1'b1"):
-                const_nets[lhs] = rhs
-            else:
-                alias[lhs] = rhs
-
-    # assign statements (aliases)
-    for line in re.findall(r"assign\s+[^;]+;", module_body):
-        lhs, rhs = line.replace("assign", "", 1).strip().strip(";").split("=")
-        alias[sanitize_net(lhs)] = sanitize_net(rhs)
+    # Ports declared later (non-ANSI style); skipped when the header already
+    # gave both directions, as in the ANSI modules this project emits
+    if not (inputs and outputs):
+        for m in OUT_DECL_RE.finditer(module_body):
+            for name in "".join(m.group(1).split()).split(","):
+                if name and name not in outputs:
+                    outputs.append(name)
+
+        for m in IN_DECL_RE.finditer(module_body):
+            for name in "".join(m.group(1).split()).split(","):
+                if name and name not in inputs:
+                    inputs.append(name)
+
+    # Single scan: wire aliases/constants and assigns are recorded directly;
+    # fa instances are kept for after the scan, once every alias is known
+    fa_items: List[Tuple[str, str]] = []
+    for m in MODULE_ITEM_RE.finditer(module_body):
+        kind = m.lastgroup
+        if kind == "pins":
+            fa_items.append((m.group("inst"), m.group("pins")))
+        elif kind == "assign":
+            lhs, rhs = m.group("assign").split("=")
+            alias[lhs.strip()] = rhs.strip()
+        else:
+            line = m.group("wire")
+            if "=" in line:
+                lhs, rhs = line.split("=")
+                lhs = lhs.strip()
+                rhs = rhs.strip()
+                if rhs in ("1'b0", "1'b1"):
+                    const_nets[lhs] = rhs
+                else:
+                    alias[lhs] = rhs
 
     # Parse FA instances
     net_drivers: Dict[str, str] = {}
@@ -150,11 +160,20 @@ def parse_verilog(path: Path, top: str | None = None) -> Tuple[str, Dict[str, Di
         nodes.setdefault(node_id, {"label": literal, "type": "literal"})
         net_drivers[literal] = node_id
 
-    def resolve(net: str) -> str:
-        net = sanitize_net(net)
+    # Path-compress the alias chains once: every alias then points straight at
+    # its terminal net and resolve() is a single lookup
+    for name in list(alias):
+        net = name
+        path = []
         while net in alias:
+            path.append(net)
             net = alias[net]
-        return net
+        for hop in path:
+            alias[hop] = net
+
+    # Every net reaching resolve() is already stripped at parse time
+    def resolve(net: str) -> str:
+        return alias.get(net, net)
 
     # Constant aliases (e.g., T0 = 1'b1)
     for name, value in const_nets.items():
@@ -166,8 +185,12 @@ def parse_verilog(path: Path, top: str | None = None) -> Tuple[str, Dict[str, Di
         if src:
             edges.append((src, node_id))
 
-    for inst_name, pin_blob in INST_RE.findall(module_body):
-        pins = dict((pin, sanitize_net(sig)) for pin, sig in PIN_RE.findall(pin_blob))
+    for inst_name, pin_blob in fa_items:
+        canon = FA_PINS_CANON.fullmatch(pin_blob)
+        if canon:
+            pins = {pin: net.strip() for pin, net in canon.groupdict().items()}
+        else:
+            pins = {m.group(1): m.group(2).strip() for m in PIN_RE.finditer(pin_blob)}
         node_id = inst_name
         node_type = "fa_comp" if "_th_" in inst_name else "fa"
         nodes[node_id] = {
@@ -215,45 +238,45 @@ def parse_verilog(path: Path, top: str | None = None) -> Tuple[str, Dict[str, Di
     return module_name, nodes, edges, fa_order
 
 
+NODE_TEMPLATES = {
+    "fa": '  "{id}" [shape=box, style="rounded,filled", fillcolor="#d6eaf8", label="{label}"];',
+    "fa_comp": '  "{id}" [shape=box, style="rounded,filled", fillcolor="#aed6f1", label="{label}"];',
+    "pi": '  "{id}" [shape=ellipse, style="filled", fillcolor="#e6f2ff", label="{label}"];',
+    "po": '  "{id}" [shape=doublecircle, style="filled", fillcolor="#d5f5e3", label="{label}"];',
+    "literal": '  "{id}" [shape=box, style="filled", fillcolor="#fdebd0", label="{label}"];',
+    "const_alias": '  "{id}" [shape=hexagon, style="filled", fillcolor="#f9e79f", label="{label}"];',
+}
+DEFAULT_NODE_TEMPLATE = '  "{id}" [label="{label}"];'
+EDGE_TEMPLATE = '  "{}" -> "{}";'
+
+
 def emit_dot(module_name: str, nodes: Dict[str, Dict], edges: List[Tuple[str, str]], fa_order: List[str]) -> str:
-    lines = [
+    header = (
         f'digraph "{module_name}" {{',
         "  rankdir=LR;",
         "  nodesep=0.4;",
         "  ranksep=0.8;",
         '  labelloc="t";',
         '  label="";',
-    ]
-
-    fa_label_map = {node_id: f"FA{i}" for i, node_id in enumerate(fa_order, start=1)}
-
-    for node_id, info in nodes.items():
-        label = info["label"]
-        if info["type"] == "fa":
-            label = fa_label_map.get(node_id, label)
-            lines.append(f'  "{node_id}" [shape=box, style="rounded,filled", fillcolor="#d6eaf8", label="{label}"];')
-        elif info["type"] == "fa_comp":
-            label = fa_label_map.get(node_id, label)
-            lines.append(f'  "{node_id}" [shape=box, style="rounded,filled", fillcolor="#aed6f1", label="{label}"];')
-        elif info["type"] == "pi":
-            lines.append(f'  "{node_id}" [shape=ellipse, style="filled", fillcolor="#e6f2ff", label="{label}"];')
-        elif info["type"] == "po":
-            lines.append(f'  "{node_id}" [shape=doublecircle, style="filled", fillcolor="#d5f5e3", label="{label}"];')
-        elif info["type"] == "literal":
-            lines.append(f'  "{node_id}" [shape=box, style="filled", fillcolor="#fdebd0", label="{label}"];')
-        elif info["type"] == "const_alias":
-            value = info.get("value", "")
-            lines.append(f'  "{node_id}" [shape=hexagon, style="filled", fillcolor="#f9e79f", label="{label}"];')
-            if value:
-                lines.append(f'  "{node_id}" [xlabel="{value}"];')
-        else:
-            lines.append(f'  "{node_id}" [label="{label}"];')
-
-    for src, dst in edges:
-        lines.append(f'  "{src}" -> "{dst}";')
-
-    lines.append("}")
-    return "\n".join(lines)
+    )
+
+    def node_lines():
+        # FA nodes first, labelled by their position in fa_order; node order in
+        # the DOT text does not affect the graphviz layout
+        for i, node_id in enumerate(fa_order, start=1):
+            yield NODE_TEMPLATES[nodes[node_id]["type"]].format(id=node_id, label=f"FA{i}")
+        for node_id, info in nodes.items():
+            kind = info["type"]
+            if kind in ("fa", "fa_comp"):
+                continue
+            yield NODE_TEMPLATES.get(kind, DEFAULT_NODE_TEMPLATE).format(id=node_id, label=info["label"])
+            if kind == "const_alias":
+                value = info.get("value", "")
+                if value:
+                    yield f'  "{node_id}" [xlabel="{value}"];'
+
+    edge_lines = (EDGE_TEMPLATE.format(src, dst) for src, dst in edges)
+    return "\n".join(chain(header, node_lines(), edge_lines, ("}",)))
 
 
 def main() -> None:
@@ -267,15 +290,22 @@ def main() -> None:
 
     module_name, nodes, edges, fa_order = parse_verilog(args.verilog, args.top)
     dot_text = emit_dot(module_name, nodes, edges, fa_order)
-    out_dot = args.out_dot or args.verilog.with_suffix(".raw.dot")
-    out_dot.write_text(dot_text)
-    print(f"Wrote DOT: {out_dot}")
+    # The .raw.dot default is only written when there is no image to render;
+    # with --out-img the DOT text goes straight to dot's stdin
+    if args.out_dot or not args.out_img:
+        out_dot = args.out_dot or args.verilog.with_suffix(".raw.dot")
+        out_dot.write_text(dot_text)
+        print(f"Wrote DOT: {out_dot}")
 
     if args.out_img:
         args.out_img.parent.mkdir(parents=True, exist_ok=True)
         import subprocess
 
-        subprocess.check_call([args.dot_bin, f"-T{args.out_img.suffix.lstrip('.')}", str(out_dot), "-o", str(args.out_img)])
+        subprocess.run(
+            [args.dot_bin, f"-T{args.out_img.suffix.lstrip('.')}", "-o", str(args.out_img)],
+            input=dot_text.encode(),
+            check=True,
+        )
         print(f"Wrote image: {args.out_img}")
 
 